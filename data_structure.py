@@ -1,7 +1,7 @@
 from abc import ABC, abstractmethod
-from collections import OrderedDict
-from typing import Callable, List
-import pymmh3 as mmh3
+from typing import Callable, List, Optional
+import numpy as np
+import mmh3
 import logging
 
 
@@ -20,65 +20,118 @@ class DataStructure(ABC):
         self.logger = logging.getLogger()
         self.hash_functions: List[Callable] = []
         self.num_of_hash_functions: int = num_of_hash_functions
+        self._i_range: np.ndarray = np.arange(num_of_hash_functions, dtype=np.uint64)
         self.cache_size = cache_size
         self.cache = LRUCache(cache_size)
         self.cache_counter = 0
 
     @abstractmethod
-    def add_new(self, element: str) -> None:
+    def add_new(self, element: bytes, hashed_values: Optional[np.ndarray] = None) -> None:
         """
         Add a new element to the data structure
         :param element: The element to add
+        :param hashed_values: The element's cells indexes, as returned by hash_elements (computed if not given)
         """
         raise NotImplementedError
 
+    def add_new_batch(self, elements: List[bytes], hashed_values: np.ndarray) -> None:
+        """
+        Add all the given elements to the data structure, in order
+        :param elements: The elements to add
+        :param hashed_values: The elements' cells indexes, as returned by hash_elements
+        """
+        for element, element_hashed_values in zip(elements, hashed_values):
+            self.add_new(element, element_hashed_values)
+
     @abstractmethod
-    def should_exists(self, element: str) -> bool:
+    def should_exists(self, element: bytes, hashed_values: Optional[np.ndarray] = None) -> bool:
         """
         :param element: The element to query
+        :param hashed_values: The element's cells indexes, as returned by hash_elements (computed if not given)
         :return: True if the given element should exists in the data structure, false otherwise
                  (e.g will return true if all the bits of the bloom filter are on,
                  regardless of the real status of the data structure)
         """
         raise NotImplementedError
 
-    def is_exists(self, element: str) -> bool:
+    def should_exists_batch(self, elements: List[bytes], hashed_values: np.ndarray) -> np.ndarray:
+        """
+        :param elements: The elements to query
+        :param hashed_values: The elements' cells indexes, as returned by hash_elements
+        :return: A boolean array, True where the matching element should exists in the data structure
+        """
+        return np.fromiter((self.should_exists(element, element_hashed_values)
+                            for element, element_hashed_values in zip(elements, hashed_values)),
+                           dtype=bool, count=len(elements))
+
+    @abstractmethod
+    def hash_elements(self, elements: List[bytes]) -> np.ndarray:
+        """
+        Map all the given elements to their counters at once
+        :param elements: The elements to map
+        :return: A matrix of cells indexes, row i holds the cells of elements[i]
+        """
+        raise NotImplementedError
+
+    def is_exists(self, element: bytes) -> bool:
         """
         :param element: The element to query
         :return: True if the given element exists in the data structure, false otherwise
         """
         return self.cache.check_if_exists(element)
 
-    def _get_hash_values(self, element: str, range_size: int) -> List[int]:
+    def is_exists_batch(self, elements: List[bytes]) -> np.ndarray:
+        """
+        :param elements: The elements to query
+        :return: A boolean array, True where the matching element exists in the data structure
+        """
+        return np.fromiter(map(self.cache.check_if_exists, elements), dtype=bool, count=len(elements))
+
+    def _get_hash_values(self, element: bytes, range_size: int) -> np.ndarray:
         """
-        Map the given element to it counters using the hash functions
+        Map the given element to it counters using the hash functions.
+        The hash functions are derived from a single 128-bit hash using double hashing (h1 + i * h2)
         :param element: The element to map
-        :return: A list of cells indexes
+        :return: An array of cells indexes
         """
-        output: List[int] = []
-        for i in range(self.num_of_hash_functions):
-            hashed_value = mmh3.hash(element, i) % range_size
-            output.append(hashed_value)
-        return output
+        h1, h2 = mmh3.mmh3_x64_128_utupledigest(element, 0)
+        # Reducing h1 and h2 first keeps h1 + i * h2 far below the uint64 overflow
+        return ((h1 % range_size + self._i_range * (h2 % range_size)) % range_size).astype(np.int32)
+
+    def _get_hash_matrix(self, elements: List[bytes], range_size: int) -> np.ndarray:
+        """
+        Map the given elements to their counters using the hash functions
+        :param elements: The elements to map
+        :param range_size: The number of cells to map into
+        :return: A (num of elements, num of hash functions) matrix of cells indexes
+        """
+        hashes: np.ndarray = np.array([mmh3.mmh3_x64_128_utupledigest(element, 0) for element in elements],
+                                      dtype=np.uint64).reshape(-1, 2)
+        hashes %= np.uint64(range_size)
+        # Broadcast h1 + i * h2 over all the elements (rows) and hash functions (columns) at once
+        output: np.ndarray = (hashes[:, :1] + hashes[:, 1:] * self._i_range) % np.uint64(range_size)
+        return output.astype(np.int32)
 
 
 class LRUCache:
 
     # initialising capacity
     def __init__(self, capacity: int):
-        self.cache = OrderedDict()
+        # dict keeps insertion order, so its first key is always the least recently used one
+        self.cache: dict = {}
         self.capacity = capacity
 
-    def check_if_exists(self, key: str) -> bool:
+    def check_if_exists(self, key: bytes) -> bool:
         if key in self.cache:
             return True
         return False
 
-    def put(self, key: str, value=None) -> None:
+    def put(self, key: bytes, value=None) -> None:
+        if key in self.cache:
+            del self.cache[key]
         self.cache[key] = value
-        self.cache.move_to_end(key)
         if len(self.cache) > self.capacity:
-            self.cache.popitem(last=False)
+            del self.cache[next(iter(self.cache))]
 
     def __len__(self):
         return len(self.cache)
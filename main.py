@@ -5,9 +5,8 @@ from selective_counting_bloom_filter import SCBloomFilter
 from data_structure import DataStructure
 from typing import List, Tuple
 from min_cut import MinCut
+import numpy as np
 import random
-import socket
-import struct
 
 
 
@@ -57,7 +56,18 @@ class Results(object):
                f'True negative rate: {self.tn / (self.tn + self.fp)}\n'
 
 
-def generate_random_lists_of_ips(num_of_ips: int, repetitive_percent: int) -> Tuple[List[str], List[str]]:
+def _generate_random_ips(rng: np.random.Generator, num_of_ips: int) -> List[bytes]:
+    """
+    Generate random IPs in bulk
+    :param rng: The random generator to use
+    :param num_of_ips: Num of IPs to generate
+    :return: A list of IPs, each packed as 4 big-endian bytes
+    """
+    ips: bytes = rng.integers(1, 0xffffffff, size=num_of_ips, dtype=np.uint32, endpoint=True).astype('>u4').tobytes()
+    return [ips[i:i + 4] for i in range(0, len(ips), 4)]
+
+
+def generate_random_lists_of_ips(num_of_ips: int, repetitive_percent: int) -> Tuple[List[bytes], List[bytes]]:
     """
     Generate a list of IPs
     :param num_of_ips: Num of IPs to generate
@@ -66,23 +76,17 @@ def generate_random_lists_of_ips(num_of_ips: int, repetitive_percent: int) -> Tu
     """
     if repetitive_percent > 100 or repetitive_percent < 0:
         raise Exception("repetitive_percent must be a value between 0-100")
-    insert: list = []
-    query: list = []
+    rng: np.random.Generator = np.random.default_rng()
     # Add random IPs to insert list
     repetitive_percent /= 100
     num_of_random_ips: int = int(num_of_ips * (1 - repetitive_percent))
-    for _ in range(num_of_random_ips):
-        random_ip = socket.inet_ntoa(struct.pack('>I', random.randint(1, 0xffffffff)))
-        insert.append(random_ip)
+    insert: list = _generate_random_ips(rng, num_of_random_ips)
     # Add random IPs to query list
-    for _ in range(num_of_random_ips):
-        random_ip = socket.inet_ntoa(struct.pack('>I', random.randint(1, 0xffffffff)))
-        query.append(random_ip)
+    query: list = _generate_random_ips(rng, num_of_random_ips)
     # Add repetitive IPs
     num_of_repetitive_ips: int = int(num_of_ips * repetitive_percent)
     num_of_unique_repetitive_ips: int = int(num_of_repetitive_ips * NUM_OF_GENERATED_HEAVY_HITTERS)
-    for _ in range(num_of_unique_repetitive_ips):
-        repetitive_ip = socket.inet_ntoa(struct.pack('>I', random.randint(1, 0xffffffff)))
+    for repetitive_ip in _generate_random_ips(rng, num_of_unique_repetitive_ips):
         for _ in range(int(num_of_repetitive_ips / num_of_unique_repetitive_ips)):
             insert.append(repetitive_ip)
             query.append(repetitive_ip)
@@ -91,7 +95,7 @@ def generate_random_lists_of_ips(num_of_ips: int, repetitive_percent: int) -> Tu
     return insert, query
 
 
-def _test(ds: DataStructure, ips_to_insert: List[str], ips_to_query: List[str]) -> Results:
+def _test(ds: DataStructure, ips_to_insert: List[bytes], ips_to_query: List[bytes]) -> Results:
     """
     Test the performance of a given data structure
     :param ds: The data structure to test
@@ -99,29 +103,22 @@ def _test(ds: DataStructure, ips_to_insert: List[str], ips_to_query: List[str])
     :param ips_to_query: List of IPs to query the data structure
     :return: A results object, containing the num of FP, num of TP, num of FN, num of TN
     """
-    for ip in ips_to_insert:
-        ds.add_new(ip)
+    # Hashes depend only on the IPs, so map all of them to their cells up-front
+    inserts_hashed_values: np.ndarray = ds.hash_elements(ips_to_insert)
+    queries_hashed_values: np.ndarray = ds.hash_elements(ips_to_query)
+    ds.add_new_batch(ips_to_insert, inserts_hashed_values)
+    should_exists: np.ndarray = ds.should_exists_batch(ips_to_query, queries_hashed_values)
+    is_exists: np.ndarray = ds.is_exists_batch(ips_to_query)
     results: Results = Results()
-    for ip in ips_to_query:
-
-        should_exists: bool = ds.should_exists(ip)
-
-        if should_exists:
-
-            if ds.is_exists(ip):
-                results.tp += 1
-            else:
-                results.fp += 1
-        else:
-            if ds.is_exists(ip):
-                results.fn += 1
-            else:
-                results.tn += 1
-        results.total += 1
+    results.tp = int(np.count_nonzero(should_exists & is_exists))
+    results.fp = int(np.count_nonzero(should_exists & ~is_exists))
+    results.fn = int(np.count_nonzero(~should_exists & is_exists))
+    results.tn = int(np.count_nonzero(~should_exists & ~is_exists))
+    results.total = len(ips_to_query)
     return results
 
 
-def test_min_cut(ips_to_insert: List[str], ips_to_query: List[str]) -> Results:
+def test_min_cut(ips_to_insert: List[bytes], ips_to_query: List[bytes]) -> Results:
     """
     Test Min-Cut data structure
     :param ips_to_insert: List of IPs to add to the data structure
@@ -133,7 +130,7 @@ def test_min_cut(ips_to_insert: List[str], ips_to_query: List[str]) -> Results:
     return output
 
 
-def test_sc_bloom_filter(ips_to_insert: List[str], ips_to_query: List[str]) -> Results:
+def test_sc_bloom_filter(ips_to_insert: List[bytes], ips_to_query: List[bytes]) -> Results:
     """
     Test "Selective Counting Bloom Filter" data structure
     :param ips_to_insert: List of IPs to add to the data structure
@@ -167,8 +164,8 @@ def main() -> None:
     - Min-Cut data structure
     """
     logging.basicConfig(stream=sys.stdout, level=logging.DEBUG)
-    list_of_ips_to_insert: List[str]
-    list_of_ips_to_query: List[str]
+    list_of_ips_to_insert: List[bytes]
+    list_of_ips_to_query: List[bytes]
     list_of_ips_to_insert, list_of_ips_to_query = generate_random_lists_of_ips(NUM_OF_IPS_TO_INSERT,
                                                                                INSERT_REPEAT_PERCENTAGE)
     mc_results: Results = test_min_cut(list_of_ips_to_insert, list_of_ips_to_query)
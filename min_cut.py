@@ -1,10 +1,42 @@
-import sys
-
 from data_structure import DataStructure
-from typing import List
+from typing import List, Optional
+from numba import njit, prange
+import numpy as np
 import logging
 
 
+@njit('int32(int32[:, :], int32[:])', cache=True)
+def _count_kernel(table: np.ndarray, cells: np.ndarray) -> int:
+    """
+    Compiled implementation of MinCut._count
+    """
+    min_val = table[0, cells[0]]
+    for i in range(1, cells.shape[0]):
+        val = table[i, cells[i]]
+        if val < min_val:
+            min_val = val
+    return min_val
+
+
+@njit('void(int32[:, :], int32[:])', cache=True)
+def _inc_kernel(table: np.ndarray, cells: np.ndarray) -> None:
+    """
+    Compiled implementation of MinCut._inc
+    """
+    for i in range(cells.shape[0]):
+        table[i, cells[i]] += 1
+
+
+@njit('void(int32[:, :], int32[:, :])', parallel=True, cache=True)
+def _inc_batch_kernel(table: np.ndarray, cells: np.ndarray) -> None:
+    """
+    Increment the counters of many elements, each thread owns whole rows of the table
+    """
+    for i in prange(cells.shape[1]):
+        for j in range(cells.shape[0]):
+            table[i, cells[j, i]] += 1
+
+
 class MinCut(DataStructure):
     """
     This class implements a min-cut data structure
@@ -16,61 +48,86 @@ class MinCut(DataStructure):
         self.num_of_buckets = num_of_buckets
         self.num_of_hash_functions = num_of_hash_functions
         self.num_of_elements_to_save: int = num_of_elements_to_save
-        self.table: List = []
+        self.table: np.ndarray
         self.elements: set = set()
         self._init_table(num_of_rows=num_of_hash_functions, num_of_cols=num_of_buckets)
 
-    def add_new(self, element: str) -> None:
+    def add_new(self, element: bytes, hashed_values: Optional[np.ndarray] = None) -> None:
         """
         Add a new element to the Min-Cut data structure
         :param element: The element to add
+        :param hashed_values: The element's cells indexes (computed if not given)
         """
         self.cache.put(element)
         self.elements.add(element)
-        hashed_values: List[int] = self._get_hash_values(element, self.num_of_buckets)
+        if hashed_values is None:
+            hashed_values = self._get_hash_values(element, self.num_of_buckets)
         self._inc(hashed_values)
 
-    def should_exists(self, element: str) -> bool:
+    def add_new_batch(self, elements: List[bytes], hashed_values: np.ndarray) -> None:
+        """
+        Add all the given elements to the Min-Cut data structure.
+        The counters don't depend on the insertion order, so they are all incremented at once.
+        :param elements: The elements to add
+        :param hashed_values: The elements' cells indexes, as returned by hash_elements
+        """
+        for element in elements:
+            self.cache.put(element)
+        self.elements.update(elements)
+        _inc_batch_kernel(self.table, hashed_values)
+
+    def should_exists(self, element: bytes, hashed_values: Optional[np.ndarray] = None) -> bool:
         """
         :param element: The element to query
+        :param hashed_values: The element's cells indexes (computed if not given)
         :return: True iff the sum of the counters in the table is bigger than m/k,
                  when m is the number of elements we saw until now,
                  and k is the maximum number of elements our data structure can hold.
         """
         m: float = len(self.elements) / self.num_of_elements_to_save
-        hashed_values: List[int] = self._get_hash_values(element, self.num_of_buckets)
+        if hashed_values is None:
+            hashed_values = self._get_hash_values(element, self.num_of_buckets)
         total_sum: int = self._count(hashed_values)
         return total_sum >= m
 
+    def should_exists_batch(self, elements: List[bytes], hashed_values: np.ndarray) -> np.ndarray:
+        """
+        Query all the given elements at once, see should_exists
+        :param elements: The elements to query
+        :param hashed_values: The elements' cells indexes, as returned by hash_elements
+        :return: A boolean array, True where the matching element should exists in the data structure
+        """
+        m: float = len(self.elements) / self.num_of_elements_to_save
+        total_sums: np.ndarray = self.table[self._i_range, hashed_values].min(axis=1)
+        return total_sums >= m
+
+    def hash_elements(self, elements: List[bytes]) -> np.ndarray:
+        """
+        Map all the given elements to their cells in the table
+        :param elements: The elements to map
+        :return: A matrix of cells indexes, row i holds the cells of elements[i]
+        """
+        return self._get_hash_matrix(elements, self.num_of_buckets)
+
     def _init_table(self, num_of_rows: int, num_of_cols: int) -> None:
         """
         Init the actual data structure's table with all counters equal to 0
         :param num_of_rows: Number of rows
         :param num_of_cols: Number of columns
         """
-        for i in range(num_of_rows):
-            new_col: list = []
-            for j in range(num_of_cols):
-                new_col.append(0)
-            self.table.append(new_col)
+        self.table = np.zeros((num_of_rows, num_of_cols), dtype=np.int32)
 
-    def _count(self, cells: List[int]) -> int:
+    def _count(self, cells: np.ndarray) -> int:
         """
         Sum the counters of the given element
-        :param cells: List of tuples representing a single cell in the table
+        :param cells: The element's cell index in each row of the table
         :return: The total sum
         """
-        min_val: int = sys.maxsize
-        for i, cell in enumerate(cells):
-            val = self.table[i][cell]
-            if val < min_val:
-                min_val = val
-        return min_val
+        return int(_count_kernel(self.table, cells))
 
-    def _inc(self, cells: List[int]) -> None:
+    def _inc(self, cells: np.ndarray) -> None:
         """
         Increment the counters of the given element
-        :param cells: List of tuples representing a single cell in the table
+        :param cells: The element's cell index in each row of the table
         """
-        for i, cell in enumerate(cells):
-            self.table[i][cell] += 1
+        _inc_kernel(self.table, cells)
@@ -1,8 +1,35 @@
 from data_structure import DataStructure
+from typing import List, Optional
+from numba import njit
+import numpy as np
 import logging
 import math
 
 ALPHA = 100
+LOG_ALPHA = math.log(ALPHA)
+
+
+@njit('void(uint16[:], int32[:])', cache=True)
+def _add_kernel(bloom_filter: np.ndarray, hashed_values: np.ndarray) -> None:
+    """
+    Compiled implementation of SCBloomFilter._add_element_to_bloom_filter
+    """
+    for i in range(hashed_values.shape[0]):
+        bloom_filter[hashed_values[i]] += 1
+
+
+@njit('float64(uint16[:], int32[:])', cache=True)
+def _check_kernel(bloom_filter: np.ndarray, hashed_values: np.ndarray) -> float:
+    """
+    Compiled implementation of SCBloomFilter._check_bloom_filter
+    """
+    mul_res = 1.0
+    for i in range(hashed_values.shape[0]):
+        val = bloom_filter[hashed_values[i]]
+        if val == 0:
+            return 0.0
+        mul_res *= val
+    return mul_res
 
 
 class SCBloomFilter(DataStructure):
@@ -15,90 +42,127 @@ class SCBloomFilter(DataStructure):
         self.logger = logging.getLogger()
         self.n = 0  # number of inserted elements to the bloom filter
         self.max_n = max_n
-        self._update_bound()
         self.bf_size = bf_size
-        self.bloom_filter = [0] * bf_size
         self.memory_size = memory_size
+        # The bound only depends on the sizes once an element was inserted, so compute it once
+        self._nonzero_bound = 1 / (1 + ALPHA * math.pow(2, (math.log(2, math.e) * (self.bf_size / self.max_n))))
+        self._update_bound()
+        # log(bf_size ^ k) is constant, computing bf_size ^ k itself on every query is expensive
+        self._log_bf_size_pow_k = self.num_of_hash_functions * math.log(bf_size)
+        # log((n * k) ^ k), only changes when an element is inserted to the bloom filter (-inf while n == 0)
+        self._log_n_k_pow_k = -math.inf
+        # A counter is bounded by k * max_n, since double hashing may map all k indexes of an element to one cell
+        # (when h2 % bf_size == 0). That bound exceeds uint16, but reaching it needs ~2^16 increments on a single cell
+        # out of k * max_n spread uniformly over bf_size cells, so 16 bits per counter are enough in practice
+        self.bloom_filter: np.ndarray = np.zeros(bf_size, dtype=np.uint16)
         self.elements = set()
 
-    def add_new(self, element: str) -> None:
+    def add_new(self, element: bytes, hashed_values: Optional[np.ndarray] = None) -> None:
         """
         If the a priori probability of an element x satisfies the Bloom Filter paradox (bigger than self.bound),
         we will not take the answer of the bloom filter into account after the query.
         Therefore, it is better not to even insert it in the bloom filter, so as to reduce the load of the bloom filter.
         :param element: The element to add
+        :param hashed_values: The element's cells indexes (computed if not given)
         """
         self.elements.add(element)
         self.cache.put(element)
-        if not self._satisfy_paradox():
-            if self.max_n == self.n:
-                return
-            self._add_element_to_bloom_filter(element)
+        # Once the bloom filter is full nothing is inserted, so skip the paradox check entirely
+        if self.max_n != self.n and not self._satisfy_paradox():
+            if hashed_values is None:
+                hashed_values = self._get_hash_values(element, self.bf_size)
+            self._add_element_to_bloom_filter(hashed_values)
             self.n += 1
+            self._log_n_k_pow_k = self.num_of_hash_functions * math.log(self.n * self.num_of_hash_functions)
             self._update_bound()
 
-    def should_exists(self, element: str) -> bool:
+    def should_exists(self, element: bytes, hashed_values: Optional[np.ndarray] = None) -> bool:
         """
         Check if the given element exists in the Bloom Filter
         If the a priori probability of an element x satisfies the Bloom paradox, we do not want to take the answer of
         the Bloom filter into account, and therefore it is better to not even query it
         :param element: The element to query
+        :param hashed_values: The element's cells indexes (computed if not given)
         :return: True iff the element is in the cache by the ans of the bloom filter
         """
-        bf_ans = self._check_bloom_filter(element)
+        if hashed_values is None:
+            hashed_values = self._get_hash_values(element, self.bf_size)
+        bf_ans = self._check_bloom_filter(hashed_values)
         if bf_ans == 0:
             return False
+        return bool(self._passes_threshold(bf_ans))
+
+    def should_exists_batch(self, elements: List[bytes], hashed_values: np.ndarray) -> np.ndarray:
+        """
+        Query all the given elements at once, see should_exists
+        :param elements: The elements to query
+        :param hashed_values: The elements' cells indexes, as returned by hash_elements
+        :return: A boolean array, True where the matching element should exists in the data structure
+        """
+        bf_ans: np.ndarray = self.bloom_filter[hashed_values].prod(axis=1, dtype=np.float64)
+        return self._passes_threshold(bf_ans)
+
+    def _passes_threshold(self, bf_ans):
+        """
+        Decide by the a priori probability whether the answer of the bloom filter is trusted.
+        res = nominator / (nominator + denominator_term) >= 1 / (1 + ALPHA)
+        <=> log(denominator_term) - log(nominator) <= log(ALPHA), which avoids the huge k-th powers
+        :param bf_ans: The multiplication of the counters, a float or an array of floats
+        :return: A boolean (array) matching bf_ans, True where the element should exists
+        """
         apriori_prob = self._get_apriori_prob()
-        nominator = math.pow(self.bf_size, self.num_of_hash_functions) * bf_ans * apriori_prob
-        denominator = nominator + math.pow(self.n * self.num_of_hash_functions, self.num_of_hash_functions) * (
-                1 - apriori_prob)
-        res = nominator / denominator
-        return res >= (1 / (1 + ALPHA))
+        if apriori_prob == 0:
+            return np.zeros_like(bf_ans, dtype=bool)
+        if apriori_prob >= 1:
+            return bf_ans != 0
+        # An empty counter gives log(0) = -inf which always fails the test,
+        # on an empty filter both terms are -inf and the NaN difference fails it too
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_nominator = self._log_bf_size_pow_k + np.log(bf_ans) + math.log(apriori_prob)
+            log_denominator_term = self._log_n_k_pow_k + math.log1p(-apriori_prob)
+            return log_denominator_term - log_nominator <= LOG_ALPHA
+
+    def hash_elements(self, elements: List[bytes]) -> np.ndarray:
+        """
+        Map all the given elements to their cells in the bloom filter
+        :param elements: The elements to map
+        :return: A matrix of cells indexes, row i holds the cells of elements[i]
+        """
+        return self._get_hash_matrix(elements, self.bf_size)
 
     def _satisfy_paradox(self):
         """
         Checks if adding an element to the Bloom Filter may satisfy the paradox
         :return:
         """
-        apriori_prob = self._get_apriori_prob()
-        if apriori_prob < self.bound:
-            return True
-        return False
+        # apriori_prob < bound <=> len(cache) < bound * memory_size, and len(cache) is an integer
+        return len(self.cache) < self._cache_len_threshold
 
     def _get_apriori_prob(self):
         return len(self.cache) / self.memory_size
 
-    def _add_element_to_bloom_filter(self, element):
+    def _add_element_to_bloom_filter(self, hashed_values):
         """
         This function add an element to our bloom filter using K hash function
-        :param element: Element to add
+        :param hashed_values: The cells indexes of the element to add
         :return:
         """
-        hashed_values = self._get_hash_values(element, self.bf_size)
-        for value in hashed_values:
-            self.bloom_filter[value] += 1
+        _add_kernel(self.bloom_filter, hashed_values)
 
     def _update_bound(self):
         """
         Update the bound corresponding to the sizes in each case.
         :return:
         """
-        if self.n == 0:
-            self.bound = 0
-        else:
-            self.bound = 1 / (1 + ALPHA * math.pow(2, (math.log(2, math.e) * (self.bf_size / self.max_n))))
+        self.bound = 0 if self.n == 0 else self._nonzero_bound
+        self._cache_len_threshold = math.ceil(self.bound * self.memory_size)
 
-    def _check_bloom_filter(self, element):
+    def _check_bloom_filter(self, hashed_values):
         """
-        This function get the relevant hash value according to the element and return the multiplication of all the
-        counters.
-        :param element: element to check if exist
+        This function get the relevant counters according to the element's hash values and return the multiplication
+        of all the counters.
+        :param hashed_values: The cells indexes of the element to check if exist
         :return: multiplication of all the counters
         """
-        hashed_values = self._get_hash_values(element, self.bf_size)
-        mul_res = 1
-        for hash_val in hashed_values:
-            if self.bloom_filter[hash_val] == 0:
-                return 0
-            mul_res *= self.bloom_filter[hash_val]
-        return mul_res
+        # The product of k counters may overflow any integer dtype, and is only used in float arithmetic
+        return _check_kernel(self.bloom_filter, hashed_values)